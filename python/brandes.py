@@ -1,4 +1,5 @@
-from collections import deque, defaultdict
+import numpy as np
+from numba import njit, prange, get_num_threads
 
 # Graph as adjacency list
 #  0 -- 1 -- 3 --  4
@@ -11,64 +12,104 @@ graph = {
     '4': ['3'],
 }
 
-def brandes_bfs(source, graph):
+def graph_to_csr(graph):
+    # relabel nodes to 0..n-1, neighbors of v are indices[indptr[v]:indptr[v+1]]
+    # in_indptr has the same layout for the incoming edges (the graph may be directed)
+    nodes = list(graph)
+    node_idx = {v: i for i, v in enumerate(nodes)}
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int32)
+    for i, v in enumerate(nodes):
+        indptr[i + 1] = indptr[i] + len(graph[v])
+    indices = np.fromiter((node_idx[w] for v in nodes for w in graph[v]), dtype=np.int32, count=indptr[-1])
+    in_indptr = np.zeros(len(nodes) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(indices, minlength=len(nodes)), out=in_indptr[1:])
+    return nodes, indptr, indices, in_indptr
+
+@njit(cache=True)
+def bfs_buffers(n, m):
+    # allocated once and reused for every source
+    d = np.empty(n, dtype=np.int32)             # distances
+    sigma = np.empty(n, dtype=np.int64)         # # shortest paths
+    # predecessors of w are sources of incoming edges, so they are stored in P_data[in_indptr[w]:in_indptr[w]+P_len[w]]
+    P_data = np.empty(m, dtype=np.int32)
+    P_len = np.empty(n, dtype=np.int32)
+    # every node is visited once, so the BFS queue and the stack for later processing
+    # are the same array, the queue is S[head:tail]
+    S = np.empty(n, dtype=np.int32)
+    delta = np.empty(n, dtype=np.float64)       # dependencies
+    return d, sigma, P_data, P_len, S, delta
+
+@njit(cache=True)
+def brandes_bfs(source, indptr, indices, in_indptr, d, sigma, P_data, P_len, S):
     # Step 1 — Initialization
-    d = {v: -1 for v in graph}                  # distances
-    sigma = {v: 0 for v in graph}               # # shortest paths
-    P = {v: [] for v in graph}                  # predecessors
+    d.fill(-1)
+    sigma.fill(0)
+    P_len.fill(0)
 
     d[source] = 0
     sigma[source] = 1
 
-    Q = deque()                                 # BFS queue
-    S = []                                      # stack for later processing
+    head = 0
+    tail = 0
 
-    Q.append(source)
+    S[tail] = source
+    tail += 1
 
     # Step 2 — BFS
-    while Q:
-        v = Q.popleft()
-        S.append(v)
+    while head < tail:
+        v = S[head]
+        head += 1
 
-        for w in graph[v]:
+        for k in range(indptr[v], indptr[v + 1]):
+            w = indices[k]
             # If w is found for the first time
             if d[w] < 0:
-                Q.append(w)
+                S[tail] = w
+                tail += 1
                 d[w] = d[v] + 1
 
             # If the shortest path to w is via v
             if d[w] == d[v] + 1:
                 sigma[w] += sigma[v]
-                P[w].append(v)
+                P_data[in_indptr[w] + P_len[w]] = v
+                P_len[w] += 1
 
-    return S, d, sigma, P
+    return tail
 
 
-# Run BFS from source 'A'
-S, d, sigma, P = brandes_bfs('0', graph)
+nodes, indptr, indices, in_indptr = graph_to_csr(graph)
+
+# Run BFS from source '0'
+d, sigma, P_data, P_len, S, delta = bfs_buffers(len(nodes), len(indices))
+S = S[:brandes_bfs(nodes.index('0'), indptr, indices, in_indptr, d, sigma, P_data, P_len, S)]
+
+def predecessors(v):
+    return [nodes[u] for u in P_data[in_indptr[v]:in_indptr[v] + P_len[v]]]
 
 # Show results
-print("Stack S (BFS visitation order):", S)
+print("Stack S (BFS visitation order):", [nodes[v] for v in S])
 print("\nDistances (d):")
-for v in d:
-    print(f"{v}: {d[v]}")
+for i, v in enumerate(nodes):
+    print(f"{v}: {d[i]}")
 
 print("\nShortest path counts (sigma):")
-for v in sigma:
-    print(f"{v}: {sigma[v]}")
+for i, v in enumerate(nodes):
+    print(f"{v}: {sigma[i]}")
 
 print("\nPredecessors (P):")
-for v in P:
-    print(f"{v}: {P[v]}")
+for i, v in enumerate(nodes):
+    print(f"{v}: {predecessors(i)}")
 
-def dependency_accumulation(S, P, sigma, source, Cb):
+@njit(cache=True)
+def dependency_accumulation(S, in_indptr, P_data, P_len, sigma, source, Cb, delta):
     # δ[v] will store dependencies for each node
-    delta = {v: 0 for v in P}
+    delta.fill(0.0)
 
     # Process nodes in reverse BFS order
-    while S:
-        w = S.pop()  # take the last visited node
-        for v in P[w]:  # for each predecessor of w
+    for i in range(S.shape[0] - 1, -1, -1):
+        w = S[i]  # take the last visited node
+        for k in range(in_indptr[w], in_indptr[w] + P_len[w]):  # for each predecessor of w
+            v = P_data[k]
             # Formula from Brandes:
             # δ[v] += (σ[v] / σ[w]) * (1 + δ[w])
             delta[v] += (sigma[v] / sigma[w]) * (1 + delta[w])
@@ -78,23 +119,40 @@ def dependency_accumulation(S, P, sigma, source, Cb):
             Cb[w] += delta[w]
     return Cb
 
-Cb = {v: 0 for v in P}
+Cb = np.zeros(len(nodes), dtype=np.float64)
 
 # Run Step 2
-Cb = dependency_accumulation(S.copy(), P, sigma, 'A', Cb)
+Cb = dependency_accumulation(S, in_indptr, P_data, P_len, sigma, nodes.index('0'), Cb, delta)
 
-print("Betweenness after source A contribution:")
-for v, score in Cb.items():
-    print(f"{v}: {score}")
+print("Betweenness after source 0 contribution:")
+for i, v in enumerate(nodes):
+    print(f"{v}: {Cb[i]}")
 
 # compute the whole cb for all nodes again
 
+@njit(cache=True)
+def accumulate_sources(first, step, indptr, indices, in_indptr, Cb):
+    # scratch buffers are allocated once and reset per source instead of reallocated
+    n = indptr.shape[0] - 1
+    d, sigma, P_data, P_len, S, delta = bfs_buffers(n, indices.shape[0])
+    for v in range(first, n, step):
+        tail = brandes_bfs(v, indptr, indices, in_indptr, d, sigma, P_data, P_len, S)
+        dependency_accumulation(S[:tail], in_indptr, P_data, P_len, sigma, v, Cb, delta)
+
+@njit(cache=True, parallel=True)
+def betweenness_centrality_csr(indptr, indices, in_indptr, nthreads):
+    # the sources are independent, each thread takes every nthreads-th source
+    # and accumulates into its own Cb row, the rows are summed at the end
+    n = indptr.shape[0] - 1
+    Cb_local = np.zeros((nthreads, n), dtype=np.float64)
+    for t in prange(nthreads):
+        accumulate_sources(t, nthreads, indptr, indices, in_indptr, Cb_local[t])
+    return Cb_local.sum(axis=0)
+
 def compute_betweenness_centrality(graph):
-    Cb = {v: 0 for v in graph}
-    for v in graph:
-        S, d, sigma, P = brandes_bfs(v, graph)
-        dependency_accumulation(S.copy(), P, sigma, v, Cb)
-    return Cb
+    nodes, indptr, indices, in_indptr = graph_to_csr(graph)
+    Cb = betweenness_centrality_csr(indptr, indices, in_indptr, get_num_threads())
+    return {v: Cb[i] for i, v in enumerate(nodes)}
 
 Cb = compute_betweenness_centrality(graph)
 for v, score in Cb.items():
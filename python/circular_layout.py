@@ -1,7 +1,9 @@
 import networkx as nx
 import csv
 import matplotlib.pyplot as plt
-import math
+import numpy as np
+from numba import njit, prange
+from python_tsp.heuristics import solve_tsp_local_search  # pip install python-tsp
 import itertools
 import random
 from typing import List, Tuple, Dict, Iterable
@@ -32,67 +34,104 @@ def load_example_data():
 
     # Open and read the CSV
     with open("edges.csv", newline="") as f:
-        reader = csv.DictReader(f)  # Reads columns by name: "source", "target"
-        for row in reader:
-            src = int(row["source"])
-            tgt = int(row["target"])
-            G.add_edge(src, tgt)
+        reader = csv.reader(f)
+        header = next(reader)
+        i_src = header.index("source")
+        i_tgt = header.index("target")
+        G.add_edges_from((int(row[i_src]), int(row[i_tgt])) for row in reader)
 
     print(f"Loaded {G.number_of_nodes()} nodes and {G.number_of_edges()} edges")
     return G
 
 def edges_len(G, pos, nodes, debug=False):
-    edges_len = 0.0
-    for node_idx, node in enumerate(nodes):
-        from_pos = pos[node_idx]
-        for edge in G.edges(node):
-            to_idx = nodes.index(edge[1])
-            to_pos = pos[to_idx]
-            distance = math.sqrt((to_pos[0] - from_pos[0])**2 + (to_pos[1] - from_pos[1])**2)
-            if debug:
-                print(f"{node}-{edge[1]} {distance}")
-            edges_len += distance
-    return edges_len
-
-def get_tsp_graph(G,penalty: float = 20.0):
+    node_idx = {node: idx for idx, node in enumerate(nodes)}
+    edges = list(G.edges(nodes))
+    src_idx = np.fromiter((node_idx[u] for u, _ in edges), dtype=np.int64, count=len(edges))
+    dst_idx = np.fromiter((node_idx[v] for _, v in edges), dtype=np.int64, count=len(edges))
+    P = np.asarray([pos[idx] for idx in range(len(nodes))])
+    distances = np.linalg.norm(P[src_idx] - P[dst_idx], axis=1)
+    if debug:
+        for (u, v), distance in zip(edges, distances):
+            print(f"{u}-{v} {distance}")
+    return float(distances.sum())
+
+def get_tsp_matrix(G,penalty: float = 20.0):
+    """Distance matrix of the complete tsp graph, 1.0 for connected nodes and penalty otherwise"""
     nodes = list(G.nodes())
-    tsp_graph = nx.Graph()
+    node_idx = {node: idx for idx, node in enumerate(nodes)}
+    edges = [(node_idx[u], node_idx[v]) for u, v in G.edges() if u != v]
+    src_idx = np.fromiter((u for u, _ in edges), dtype=np.int64, count=len(edges))
+    dst_idx = np.fromiter((v for _, v in edges), dtype=np.int64, count=len(edges))
 
-    for u in nodes:
-        for v in nodes:
-            if u == v:
-                continue
-            if G.has_edge(u, v) or G.has_edge(v, u):
-                dist = 1.0
-            else:
-                dist = penalty
-            tsp_graph.add_edge(u, v, weight=dist)
-
-    return tsp_graph
+    D = np.full((len(nodes), len(nodes)), penalty, dtype=np.float32)
+    np.fill_diagonal(D, 0.0)
+    D[src_idx, dst_idx] = 1.0
+    D[dst_idx, src_idx] = 1.0
+    return nodes, D
 
 def optimal_order_using_tsp(G):
-    tsp_G = get_tsp_graph(G)
+    nodes, D = get_tsp_matrix(G)
     print("start tsp")
-    order = nx.approximation.traveling_salesman.christofides(tsp_G, weight="weight")
-    #order = nx.approximation.traveling_salesman.greedy_tsp(tsp_G, weight="weight")
+    permutation, _distance = solve_tsp_local_search(D)
     print("end tsp")
-    order.pop()
-    return order
+    return [nodes[idx] for idx in permutation]
 
-def optimal_order(G,pos_list):
-    min = 100000
+def optimal_order(G):
+    """
+    Exact optimal order by branch and bound over the circle positions.
+    The cost is the circular distance of the positions (same as circular_cost).
+    The positions are filled one by one and an edge adds its length as soon as both
+    nodes are placed, so the partial cost only grows and every partial order
+    that is not better than the best complete order can be pruned.
+    The problem is a quadratic assignment (edge length depends on both positions),
+    so there is no exact Held-Karp like dp over placed node sets.
+    """
+    nodes = list(G)
+    n = len(nodes)
+    node_idx = {node: idx for idx, node in enumerate(nodes)}
+    idx = np.arange(n)
+    steps = np.abs(idx[:, None] - idx[None, :])
+    dist = np.minimum(steps, n - steps).tolist()
+    adj = [[] for _ in range(n)]
+    edges_count = 0
+    for u, v in G.edges():
+        if u != v:
+            adj[node_idx[u]].append(node_idx[v])
+            adj[node_idx[v]].append(node_idx[u])
+            edges_count += 1
+    # every not yet placed edge is at least one step long
+
+    node_pos = [-1] * n
+    order = [0] * n
+    min_cost = float("inf")
     min_order = None
-    i = 0
-
-    for order in itertools.permutations(range(1,len(G))):
-        if i % 1000 == 0:
-            print(f"iter {i}")
-        i = i+1
-        forder = (0,) + order
-        elen = edges_len(G,pos_list,forder)
-        if elen<min:
-            min = elen
-            min_order = forder
+
+    def place(p, cost, placed_edges):
+        nonlocal min_cost, min_order
+        if p == n:
+            min_cost = cost
+            min_order = tuple(nodes[i] for i in order)
+            return
+        for v in range(n):
+            if node_pos[v] >= 0:
+                continue
+            added = 0.0
+            added_edges = 0
+            for u in adj[v]:
+                if node_pos[u] >= 0:
+                    added += dist[p][node_pos[u]]
+                    added_edges += 1
+            rest_bound = edges_count - placed_edges - added_edges
+            if cost + added + rest_bound >= min_cost:
+                continue
+            node_pos[v] = p
+            order[p] = v
+            place(p + 1, cost + added, placed_edges + added_edges)
+            node_pos[v] = -1
+
+    # the first node is fixed at position 0, the layout is rotation invariant
+    node_pos[0] = 0
+    place(1, 0.0, 0)
     return min_order
 
 def draw_graph(G,pos,ax,title):
@@ -112,48 +151,97 @@ def circular_distance_by_index(i: int, j: int, n: int) -> int:
     d = abs(i - j)
     return min(d, n - d)
 
-def circular_cost(order: List, edges: Iterable[Tuple], n: int) -> float:
+def edge_arrays(edges: Iterable[Tuple], node_idx: Dict):
     """
-    Compute the true circular layout cost for 'order'.
-    order : list of nodes (length n)
-    edges : iterable of (u, v) or (u, v, w)
-    n : number of nodes
+    Split edges (u, v) or (u, v, w) into a node id pairs array edges_uv[E,2] and a weight array
+    for the jit functions. node_idx maps the node to its id 0..n-1
     """
-    pos = {node: idx for idx, node in enumerate(order)}
-    total = 0.0
+    edges_uv = []
+    edges_w = []
     for e in edges:
-        if len(e) == 3:
-            u, v, w = e
-            weight = w
-        else:
-            u, v = e
-            weight = 1.0
-        i, j = pos[u], pos[v]
-        dist = circular_distance_by_index(i, j, n)
-        total += weight * dist
-    return total
+        edges_uv.append((node_idx[e[0]], node_idx[e[1]]))
+        edges_w.append(e[2] if len(e) == 3 else 1.0)
+    return (np.asarray(edges_uv, dtype=np.int32).reshape(-1, 2),
+            np.asarray(edges_w, dtype=np.float32))
+
+def order_positions(order, order_pos=None) -> np.ndarray:
+    """
+    Inverse of the order of node ids, order_pos[node] is the position of the node.
+    A preallocated order_pos buffer is filled in place
+    """
+    if order_pos is None:
+        order_pos = np.empty(len(order), dtype=np.int32)
+    order_pos[np.asarray(order)] = np.arange(len(order), dtype=np.int32)
+    return order_pos
+
+def adj_csr(G):
+    """
+    Undirected adjacency of G as csr arrays (indptr, indices, start_node, nodes), computed once
+    and shared by all optimizers. The optimizers work on node ids, nodes[id] is the node of G.
+    Neighbors of node id are indices[indptr[id]:indptr[id+1]].
+    The start node is the id of a connected node with the smallest degree.
+    """
+    nodes = list(G)
+    node_idx = {node: idx for idx, node in enumerate(nodes)}
+    edges_uv, _edges_w = edge_arrays(G.edges(), node_idx)
+    n = len(nodes)
+    src = np.concatenate((edges_uv[:, 0], edges_uv[:, 1]))
+    dst = np.concatenate((edges_uv[:, 1], edges_uv[:, 0]))
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum(np.bincount(src, minlength=n))
+    indices = dst[np.argsort(src, kind="stable")]
+    degree = np.diff(indptr)
+    connected = np.nonzero(degree)[0]
+    start_node = int(connected[np.argmin(degree[connected])])
+    return indptr, indices, start_node, nodes
+
+@njit(cache=True)
+def circular_distance_nb(i, j, n):
+    d = abs(i - j)
+    return d if d < n - d else n - d
 
-def node_cost(order, node, adj_map):
+@njit(cache=True)
+def circular_cost(pos_of_node, edges_uv, edges_w, n):
+    """
+    Compute the true circular layout cost.
+    pos_of_node : position of every node (see order_positions)
+    edges_uv, edges_w : edges and weights (see edge_arrays)
+    n : number of nodes
+    """
     total = 0.0
-    edge_pos = order.index(node)
-    n = len(order)
-    for edge in adj_map[node]:
-        total += circular_distance_by_index(edge_pos,order.index(edge),n)
+    for k in range(edges_uv.shape[0]):
+        total += edges_w[k] * circular_distance_nb(pos_of_node[edges_uv[k, 0]], pos_of_node[edges_uv[k, 1]], n)
     return total
 
-def two_opt_improve(order: List, edges: Iterable[Tuple], max_iter: int = 1000) -> List:
+@njit(cache=True)
+def swap_delta_nb(indptr, indices, order_pos, a, b, n):
+    """Cost change if nodes a and b swap their positions, only their own edges change"""
+    pos_a = order_pos[a]
+    pos_b = order_pos[b]
+    delta = 0
+    for k in range(indptr[a], indptr[a + 1]):
+        c = indices[k]
+        if c != a and c != b:
+            delta += circular_distance_nb(pos_b, order_pos[c], n) - circular_distance_nb(pos_a, order_pos[c], n)
+    for k in range(indptr[b], indptr[b + 1]):
+        c = indices[k]
+        if c != a and c != b:
+            delta += circular_distance_nb(pos_a, order_pos[c], n) - circular_distance_nb(pos_b, order_pos[c], n)
+    return delta
+
+def two_opt_improve(order: List, adj, max_iter: int = 1000) -> List:
     """
     Simple 2-opt style local search that tries swapping two nodes (positions)
     and keeps swaps that reduce the true circular cost.
+    Only the edges of the two swapped nodes change, so a swap is evaluated
+    as cost delta over their edges and accepted swaps update two positions
     """
-    adj_map = {}
-    for u, v in edges:
-        adj_map.setdefault(u, []).append(v)
-        adj_map.setdefault(v, []).append(u) 
+    indptr, indices, _start_node, nodes = adj
+    node_idx = {node: idx for idx, node in enumerate(nodes)}
 
     n = len(order)
-    best_order = list(order)
-    # best_cost = circular_cost(best_order, edges, n)
+    best_order = [node_idx[node] for node in order]
+    order_pos = order_positions(best_order)
     improved = True
     it = 0
     while improved and it < max_iter:
@@ -165,28 +253,24 @@ def two_opt_improve(order: List, edges: Iterable[Tuple], max_iter: int = 1000) -
         for i in positions:
             for j in range(i+1, n):
                 # swap positions i and j
-                curr_cost = node_cost(best_order,i,adj_map) + node_cost(best_order,j,adj_map)
-                cand = list(best_order)
-                cand[i], cand[j] = cand[j], cand[i]
-                # cand_cost = circular_cost(cand, edges, n)
-                cand_cost = node_cost(cand,i,adj_map) + node_cost(cand,j,adj_map)
-                if cand_cost < curr_cost - 1e-12:
-                    best_order = cand
+                a, b = best_order[i], best_order[j]
+                if swap_delta_nb(indptr, indices, order_pos, a, b, n) < -1e-12:
+                    best_order[i], best_order[j] = b, a
+                    order_pos[a], order_pos[b] = j, i
                     improved = True
                     # break to restart scanning from new improved order
                     break
             if improved:
                 break
-    return best_order
+    return [nodes[node] for node in best_order]
 
 def spectral_order(G):
     fiedler_vector = nx.fiedler_vector(G)
     spectral_order = [node for _, node in sorted(zip(fiedler_vector, G.nodes()))]
     return spectral_order
 
-def seq_placement(G):
-    adj_map, min_node = gen_adj_start_node(G)
-    # order = [n for n in graph_iterator(adj_map,min_node,set())]
+def seq_placement(adj):
+    indptr, indices, min_node, nodes = adj
     visited = set()
     stack = [min_node]
     order = []
@@ -196,72 +280,84 @@ def seq_placement(G):
         if node not in visited:
             visited.add(node)
             order.append(node)
-            for n in adj_map[node]:
+            for n in indices[indptr[node]:indptr[node + 1]].tolist():
                 if n not in visited:
                     stack.append(n)
 
-    return order
-
+    return [nodes[node] for node in order]
 
-def graph_iterator(adj_map,node,visited):
-    yield node
-    visited.add(node)
-    for n in adj_map[node]:
-        if n not in visited:
-            yield from graph_iterator(adj_map,n,visited)
 
-def all_dfs_orders_my(adj_map,start):
+def all_dfs_orders_my(adj,start):
     """
     All posible dfs deep first search
-    Because of back references the generated proposal are not unique
-    but for sparse diagram much smaller than all order permutations
+    Because of back references the same order can be reached from different stacks,
+    so the rest orders are memoized on the search state and the result is deduplicated.
+    For sparse diagram much smaller than all order permutations
 
     the amount is multiply of all factor degress 
 
     Perhaps can be reduced by not trying all permutations of posible edges but only trying each edge as first position once
 
     But I suppose that the optimal order is one of the dfs orders (to be proved but seems to be obvious by looking at it)
+    The orders are node ids (see adj_csr)
     """
+    indptr, indices, _start_node, _nodes = adj
+    adj_lists = [indices[indptr[node]:indptr[node + 1]].tolist() for node in range(len(indptr) - 1)]
+
+    # the remaining orders depend only on the visited nodes and the not visited stack entries
+    memo = {}
+
     def inner_diff(visited, stack):
+        key = (frozenset(visited), tuple(n for n in stack if n not in visited))
+        if key in memo:
+            return memo[key]
+        orders = []
         order = []
         while stack:
             node = stack.pop()
             if node not in visited:
                 visited.add(node)
                 order.append(node)
-                targets = [n for n in adj_map[node] if n not in visited]
+                targets = [n for n in adj_lists[node] if n not in visited]
                 if len(targets)<=1:
-                    for n in adj_map[node]:
+                    for n in adj_lists[node]:
                         stack.append(n)
                 else:
                     for nstack in itertools.permutations(targets):
                         sub_stack = stack.copy() + list(nstack)
                         for rest_order in inner_diff(visited.copy(),sub_stack):
-                            yield order + rest_order
-                    return
-        yield order
-    
-    return list(inner_diff(set(), [start])) 
-
-def best_seq_placement(G):
-    adj_map, min_node = gen_adj_start_node(G)
-    edges = G.edges()
+                            orders.append(order + rest_order)
+                    memo[key] = orders
+                    return orders
+        orders.append(order)
+        memo[key] = orders
+        return orders
+
+    # different stacks can still lead to the same order
+    return [list(order) for order in dict.fromkeys(tuple(order) for order in inner_diff(set(), [start]))]
+
+def best_seq_placement(adj, edges_uv, edges_w):
+    # edges_uv of node ids (see edge_arrays), the best order is returned as nodes
+    min_node = adj[2]
+    nodes = adj[3]
     
     min = 100000
     min_order = None
-    i = 0
-    nodes_len = len(G)
+    nodes_len = len(adj[0]) - 1
+    pos_of_node = np.empty(nodes_len, dtype=np.int32)
 
-    for order in all_dfs_orders_my(adj_map, min_node):
-        elen = circular_cost(order, edges, nodes_len)
-        print(f"order {order} cost {elen}")
+    for order in all_dfs_orders_my(adj, min_node):
+        elen = circular_cost(order_positions(order, pos_of_node), edges_uv, edges_w, nodes_len)
+        print(f"order {[nodes[node] for node in order]} cost {elen}")
         if elen<min:
             min = elen
             min_order = order
-    return min_order
+    return [nodes[node] for node in min_order]
 
 
-def random_dfs(adj_map, start_node):
+def random_dfs(adj, start_node):
+    # order of node ids
+    indptr, indices, _start_node, _nodes = adj
     visited = set()
     stack = [start_node]
     order = []
@@ -270,66 +366,96 @@ def random_dfs(adj_map, start_node):
         if node not in visited:
             visited.add(node)
             order.append(node)
-            targets = adj_map[node]
+            targets = indices[indptr[node]:indptr[node + 1]].tolist()
             for n in random.sample(targets,len(targets)):
                 if n not in visited:
                     stack.append(n)
     return order
 
-def gen_adj_start_node(G):
-    edges = G.edges()
-    adj_map = {}
-    for u, v in edges:
-        adj_map.setdefault(u, []).append(v)
-        adj_map.setdefault(v, []).append(u)
-    min_node = None
-    min_neighbors = None
-    for node , neighbors in adj_map.items():
-        if min_node is None or len(neighbors)<min_neighbors:
-            min_node = node
-            min_neighbors = len(neighbors)
-            if min_neighbors == 1:
-                break
-    return adj_map, min_node
-
 def circular_distance_by_index(i: int, j: int, n: int) -> float:
     """Helper for circular distance between two indices."""
     d = abs(i - j)
     return min(d, n - d)
 
+@njit(cache=True)
+def circular_cost_crossing_nb(edges_uv, edges_w, order_pos, n):
+    total = 0.0
+    edges_len = edges_uv.shape[0]
+    # chord (a,b) with a < b for every edge
+    chord_a = np.empty(edges_len, dtype=np.int32)
+    chord_b = np.empty(edges_len, dtype=np.int32)
+    for k in range(edges_len):
+        pu = order_pos[edges_uv[k, 0]]
+        pv = order_pos[edges_uv[k, 1]]
+        total += edges_w[k] * circular_distance_nb(pu, pv, n)
+        chord_a[k] = min(pu, pv)
+        chord_b[k] = max(pu, pv)
+
+    total += crossing_count_nb(chord_a, chord_b, n)  # 1 unit penalty per crossing
+    return total
+
+@njit(cache=True)
+def crossing_count_nb(chord_a, chord_b, n):
+    """
+    Count crossing chords in O(E log n).
+    Chords (a,b) and (c,d) cross if endpoints alternate a < c < b < d.
+    The chords are swept by their start a, a Fenwick tree over the end positions
+    holds the chords with a smaller start, so the crossings of (c,d) are the
+    inserted chords ending strictly between c and d
+    """
+    tree = np.zeros(n + 1, dtype=np.int32)
+    sorted_idx = np.argsort(chord_a)
+    crossings = 0
+    group_start = 0
+    while group_start < sorted_idx.shape[0]:
+        # chords with the same start do not cross, query them all before inserting
+        c = chord_a[sorted_idx[group_start]]
+        group_end = group_start
+        while group_end < sorted_idx.shape[0] and chord_a[sorted_idx[group_end]] == c:
+            d = chord_b[sorted_idx[group_end]]
+            # number of inserted ends in c+1..d-1 is prefix(d-1) - prefix(c), tree is 1-based
+            if d > c + 1:
+                i = d
+                while i > 0:
+                    crossings += tree[i]
+                    i -= i & -i
+                i = c + 1
+                while i > 0:
+                    crossings -= tree[i]
+                    i -= i & -i
+            group_end += 1
+        for k in range(group_start, group_end):
+            i = chord_b[sorted_idx[k]] + 1
+            while i <= n:
+                tree[i] += 1
+                i += i & -i
+        group_start = group_end
+    return crossings
+
+@njit(cache=True, parallel=True)
+def fitness_pop(order_pos_mat, edges_uv, edges_w, n):
+    fitnesses = np.empty(order_pos_mat.shape[0], dtype=np.float64)
+    for k in prange(order_pos_mat.shape[0]):
+        fitnesses[k] = circular_cost_crossing_nb(edges_uv, edges_w, order_pos_mat[k], n)
+    return fitnesses
+
+def population_positions(population) -> np.ndarray:
+    """order_pos_mat[k, node] is the position of the node in the k-th individual"""
+    orders = np.asarray(population, dtype=np.int32)
+    order_pos_mat = np.empty_like(orders)
+    order_pos_mat[np.arange(orders.shape[0])[:, None], orders] = np.arange(orders.shape[1], dtype=np.int32)
+    return order_pos_mat
+
 def circular_cost_crossing(order: List, edges: Iterable[Tuple], n: int) -> float:
     """
     Compute the circular layout cost for 'order':
     - edge length (shorter is better)
     - +1 penalty per crossing
     """
-    pos = {node: idx for idx, node in enumerate(order)}
-    total = 0.0
-
-    # Convert edges to unified (u,v,weight) form
-    edge_list = []
-    for e in edges:
-        if len(e) == 3:
-            u, v, w = e
-        else:
-            u, v, w = e[0], e[1], 1.0
-        edge_list.append((u, v, w))
-        total += w * circular_distance_by_index(pos[u], pos[v], n)
-
-    # --- Edge crossing penalty ---
-    crossings = 0
-    for i in range(len(edge_list)):
-        u1, v1, _ = edge_list[i]
-        a, b = sorted((pos[u1], pos[v1]))
-        for j in range(i + 1, len(edge_list)):
-            u2, v2, _ = edge_list[j]
-            c, d = sorted((pos[u2], pos[v2]))
-            # edges (a,b) and (c,d) cross if endpoints alternate
-            if (a < c < b < d) or (c < a < d < b):
-                crossings += 1
-
-    total += crossings  # 1 unit penalty per crossing
-    return total
+    # node ids are the positions in order
+    node_idx = {node: idx for idx, node in enumerate(order)}
+    edges_uv, edges_w = edge_arrays(edges, node_idx)
+    return circular_cost_crossing_nb(edges_uv, edges_w, np.arange(len(order), dtype=np.int32), n)
 
 def crossover(parent1, parent2):
     """Order crossover (OX) for permutations."""
@@ -337,7 +463,8 @@ def crossover(parent1, parent2):
     a, b = sorted(random.sample(range(size), 2))
     child = [None] * size
     child[a:b] = parent1[a:b]
-    fill = [x for x in parent2 if x not in child]
+    taken = set(child[a:b])
+    fill = [x for x in parent2 if x not in taken]
     j = 0
     for i in range(size):
         if child[i] is None:
@@ -347,11 +474,14 @@ def crossover(parent1, parent2):
 
 def mutate(individual, mutation_rate=0.1):
     """Swap two elements with a certain probability."""
-    ind = individual[:]
-    for i in range(len(ind)):
-        if random.random() < mutation_rate:
-            j = random.randrange(len(ind))
-            ind[i], ind[j] = ind[j], ind[i]
+    n = len(individual)
+    # draw all random numbers at once, only the few selected positions are swapped
+    mask = np.random.random(n) < mutation_rate
+    js = np.random.randint(0, n, n)
+    ind = list(individual)
+    for i in np.nonzero(mask)[0].tolist():
+        j = js[i]
+        ind[i], ind[j] = ind[j], ind[i]
     return ind
 
 def select(population, fitnesses):
@@ -361,19 +491,22 @@ def select(population, fitnesses):
     selected.sort(key=lambda x: x[1], reverse=False)
     return selected[0][0]
 
-def genetic_opt(G, 
+def genetic_opt(G, adj,
     population_size=100,
     generations=200,
     crossover_rate=0.8,
     mutation_rate=0.1,):
-    adj_map, start_node = gen_adj_start_node(G)
-    edges = G.edges()
+    # the population are orders of node ids (see adj_csr)
+    start_node = adj[2]
+    nodes = adj[3]
+    node_idx = {node: idx for idx, node in enumerate(nodes)}
+    edges_uv, edges_w = edge_arrays(G.edges(), node_idx)
     nodes_len = len(G)
-    population = [random_dfs(adj_map,start_node) for _ in range(population_size)]
+    population = [random_dfs(adj,start_node) for _ in range(population_size)]
 
     for gen in range(generations):
         # Evaluate fitness
-        fitnesses = [circular_cost_crossing(ind,edges,nodes_len) for ind in population]
+        fitnesses = fitness_pop(population_positions(population), edges_uv, edges_w, nodes_len)
         best = min(zip(population, fitnesses), key=lambda x: x[1])
 
         print(f"Gen {gen}: best fitness = {best[1]:.4f}")
@@ -395,9 +528,9 @@ def genetic_opt(G,
         population = new_population
 
     # Return the best solution found
-    fitnesses = [circular_cost_crossing(ind,edges,nodes_len) for ind in population]
-    best = min(zip(population, fitnesses), key=lambda x: x[1])
-    return best
+    fitnesses = fitness_pop(population_positions(population), edges_uv, edges_w, nodes_len)
+    best_order, best_fitness = min(zip(population, fitnesses), key=lambda x: x[1])
+    return [nodes[node] for node in best_order], best_fitness
     
 
 G = load_example_data()
@@ -413,7 +546,7 @@ fig, axes = plt.subplots(1, 7, figsize=(10, 5))
 
 draw_graph(G,pos,axes[0],"random layout")
 
-min_order = optimal_order(G, pos_list)
+min_order = optimal_order(G)
 print(f"min_order {min_order} {edges_len(G,pos_list,min_order,True)}")
 draw_graph_order(G,pos_list,min_order,axes[1],"Optimal")
 
@@ -421,8 +554,12 @@ tsp_order = optimal_order_using_tsp(G)
 print(f"tsp order {tsp_order} {edges_len(G,pos_list,tsp_order)}")
 draw_graph_order(G,pos_list,tsp_order,axes[2],"tsp solution")
 
-#improved_order = two_opt_improve([0,1,2,3,4,5,6,7], G.edges())
-improved_order = two_opt_improve(tsp_order, G.edges())
+adj = adj_csr(G)
+node_idx = {node: idx for idx, node in enumerate(adj[3])}
+edges_uv, edges_w = edge_arrays(G.edges(), node_idx)
+
+#improved_order = two_opt_improve([0,1,2,3,4,5,6,7], adj)
+improved_order = two_opt_improve(tsp_order, adj)
 print(f"rand gen {improved_order} {edges_len(G,pos_list,improved_order)}")
 draw_graph_order(G,pos_list,improved_order,axes[3],"2-opt")
 
@@ -433,11 +570,11 @@ s_order = spectral_order(H)
 print(f"spectral order {s_order} {edges_len(G,pos_list,s_order)}")
 draw_graph_order(G,pos_list,s_order,axes[4],"spectral order")
 
-place_order = best_seq_placement(G)
+place_order = best_seq_placement(adj, edges_uv, edges_w)
 print(f"place order {place_order} {edges_len(G,pos_list,place_order)}")
 draw_graph_order(G,pos_list,place_order,axes[5],"placed")
 
-gen_order = genetic_opt(G)[0]
+gen_order = genetic_opt(G, adj)[0]
 print(f"genetic order {place_order} {edges_len(G,pos_list,gen_order)}")
 draw_graph_order(G,pos_list,gen_order,axes[6],"genetic")
 
@@ -1,5 +1,5 @@
-from rdflib import Graph, Namespace, URIRef, Literal
-from rdflib.namespace import RDF, RDFS, FOAF, XSD
+from rdflib import Graph, Namespace, Literal
+from rdflib.namespace import RDFS, FOAF, XSD
 
 # ------------------------
 # 1. Load TTL Data
@@ -12,14 +12,14 @@ print(f"Loaded {len(g)} triples from data.ttl")
 
 def add_missing_types(g, predicate, object_type):       
     # ------------------------
-    # 2. SPARQL Query
+    # 2. SPARQL Update
     # ------------------------
-    query = f"""
+    update = f"""
     PREFIX dbo: <http://dbpedia.org/ontology/>
     PREFIX dbp: <http://dbpedia.org/property/>
     PREFIX dbr: <http://dbpedia.org/resource/>
     PREFIX yago: <http://dbpedia.org/class/yago/>
-    SELECT distinct ?pl
+    INSERT {{ ?pl a {object_type} }}
     WHERE {{
         ?l {predicate} ?pl.
         FILTER isIRI(?pl)
@@ -29,9 +29,9 @@ def add_missing_types(g, predicate, object_type):
 
     print(f"Adding missing types for {predicate} with class {object_type}")
 
-    for row in g.query(query):
-        print(f"object: {row.pl}")
-        g.add((row.pl, RDF.type, URIRef(object_type)))
+    triples_before = len(g)
+    g.update(update)
+    print(f"Added {len(g) - triples_before} types")
 
 
 add_missing_types(g, "dbo:influencedBy", "dbo:ProgrammingLanguage")
@@ -3,16 +3,14 @@ import networkx as nx
 
 G = nx.karate_club_graph()
 
-with open("sample-rdf-data/karate_graph.ttl", "w") as f:
-    f.write("@prefix ex: <http://rdfglance.karate_club#> .\n")
-    f.write("@prefix foaf: <http://xmlns.com/foaf/0.1/> .\n\n")
-    f.write("# Zachary's Karate Club graph see  https://en.wikipedia.org/wiki/Zachary%27s_karate_club\n")
-    f.write("# Used to test community detection with louvain algorithm\n\n")
-
-    for node_id, node in G.nodes(data=True):
-        print(node_id)
-        print(node)
-        f.write(f"ex:{node_id} a ex:Person ; ex:club \"{node.get("club")}\" .\n")
+lines = [
+    "@prefix ex: <http://rdfglance.karate_club#> .\n",
+    "@prefix foaf: <http://xmlns.com/foaf/0.1/> .\n\n",
+    "# Zachary's Karate Club graph see  https://en.wikipedia.org/wiki/Zachary%27s_karate_club\n",
+    "# Used to test community detection with louvain algorithm\n\n",
+]
+lines.extend(f"ex:{node_id} a ex:Person ; ex:club \"{node.get('club')}\" .\n" for node_id, node in G.nodes(data=True))
+lines.extend(f"ex:{u} foaf:knows ex:{v} .\n" for u, v in G.edges())
 
-    for u, v in G.edges():
-        f.write(f"ex:{u} foaf:knows ex:{v} .\n")        
+with open("sample-rdf-data/karate_graph.ttl", "w") as f:
+    f.write("".join(lines))
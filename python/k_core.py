@@ -7,36 +7,52 @@ def compute_k_core(nodes, edges):
         adj[u].add(v)
         adj[v].add(u)
 
-    degree = {node: len(adj[node]) for node in nodes}
-    core_number = dict()
-
-    # Nodes not yet processed
-    remaining = set(nodes)
-
-    changed = True
-    k = 1
-    while remaining:
-        changed = True
-        while changed:
-            changed = False
-            to_remove = []
-            for node in remaining:
-                if degree[node] < k:
-                    to_remove.append(node)
-            if to_remove:
-                changed = True
-                for node in to_remove:
-                    remaining.remove(node)
-                    core_number[node] = k - 1
-                    for neighbor in adj[node]:
-                        if neighbor in remaining:
-                            degree[neighbor] -= 1
-        k += 1
-
-    # Remaining nodes get highest k-core
-    for node in remaining:
-        core_number[node] = k - 1
+    # Batagelj-Zaversnik O(n+m): nodes are bucket sorted by degree and the node
+    # with the lowest remaining degree is removed, this degree is its core number
+    nodes = list(nodes)
+    node_idx = {node: i for i, node in enumerate(nodes)}
+    degree = [len(adj[node]) for node in nodes]
+    max_degree = max(degree, default=0)
 
+    # bin_start[d] is the first position of nodes with degree d in vert
+    bin_start = [0] * (max_degree + 1)
+    for d in degree:
+        bin_start[d] += 1
+    start = 0
+    for d in range(max_degree + 1):
+        count = bin_start[d]
+        bin_start[d] = start
+        start += count
+
+    # vert are the nodes sorted by degree, pos[v] is the position of v in vert
+    vert = [0] * len(nodes)
+    pos = [0] * len(nodes)
+    for v, d in enumerate(degree):
+        pos[v] = bin_start[d]
+        vert[pos[v]] = v
+        bin_start[d] += 1
+    for d in range(max_degree, 0, -1):
+        bin_start[d] = bin_start[d - 1]
+    bin_start[0] = 0
+
+    for v in vert:
+        for neighbor in adj[nodes[v]]:
+            u = node_idx[neighbor]
+            if degree[u] > degree[v]:
+                # move u to the start of its bucket and shrink the bucket by one
+                du = degree[u]
+                pu = pos[u]
+                pw = bin_start[du]
+                w = vert[pw]
+                if u != w:
+                    pos[u] = pw
+                    vert[pu] = w
+                    pos[w] = pu
+                    vert[pw] = u
+                bin_start[du] += 1
+                degree[u] -= 1
+
+    core_number = {node: degree[v] for v, node in enumerate(nodes)}
     return core_number
 
 # Example graph
@@ -1,17 +1,49 @@
-from rdflib import Graph, Namespace, URIRef, Literal
-from rdflib.namespace import RDF, RDFS, FOAF, XSD
+from pyoxigraph import parse, RdfFormat, Literal
+import numpy as np
 import time
 
+from louvain import edges_to_csr
+
 # ------------------------
 # 1. Load TTL Data
 # ------------------------
+# rdflib turtle parser (notation3.py) is pure python and very slow for big files
+# oxigraph parses in rust, the triples are streamed directly into integer edge arrays
+# (node iri -> id symbol table) without keeping any triple store
 start = time.time()
 
-g = Graph()
-g.parse("../olympics.ttl", format="ttl")
+node_ids = {}
+src = np.empty(1 << 20, dtype=np.int32)
+dst = np.empty(1 << 20, dtype=np.int32)
+edges_len = 0
+triples_len = 0
+
+with open("../olympics.ttl", "rb") as f:
+    for triple in parse(f, format=RdfFormat.TURTLE):
+        triples_len += 1
+        # only node to node relations are edges
+        if isinstance(triple.object, Literal):
+            continue
+        s = node_ids.setdefault(str(triple.subject), len(node_ids))
+        o = node_ids.setdefault(str(triple.object), len(node_ids))
+        if edges_len == len(src):
+            src = np.resize(src, 2 * len(src))
+            dst = np.resize(dst, 2 * len(dst))
+        src[edges_len] = s
+        dst[edges_len] = o
+        edges_len += 1
+
+src = src[:edges_len]
+dst = dst[:edges_len]
+# undirected csr (each edge in both directions), same layout as louvain.Structure
+indptr, indices, weights = edges_to_csr(
+    len(node_ids),
+    np.concatenate((src, dst)),
+    np.concatenate((dst, src)),
+    np.ones(2 * edges_len))
 
 end = time.time()
+print(f"Loaded {triples_len} triples, {len(node_ids)} nodes, {edges_len} edges")
 print("Execution time:", end - start, "seconds")
 
-# Executiontime 72 seconds
-
+# Executiontime 72 seconds with rdflib Graph().parse
@@ -1,9 +1,11 @@
 
 
-from collections import defaultdict
-import random
 from typing import List, Dict
 import math
+import logging
+import numpy as np
+from scipy.sparse import coo_matrix
+from numba import njit, prange, get_num_threads
 
 # This is own implementation of Louvain
 # I have tried many python or rust libraries, but either they was naive implmented and slow or
@@ -14,138 +16,284 @@ import math
 # The rust implementation was written after the python and is compatible
 # The python implementation has very detailed tests for modularity and q_calculation
 
-
-class Community:
-    def __init__(self, id: int, node: int):
-        self.id = id
-        self.nodes = [node]
-        self.total_degree = 0.0
-
-    def add_node(self, node):
-        self.nodes.append(node)
-
-    def remove_node(self, node):
-        self.nodes.remove(node)
+logger = logging.getLogger(__name__)
+
+
+def edges_to_csr(nodes_len, src, dst, weights):
+    """
+    Build csr adjacency arrays from edge lists (each undirected edge in both directions).
+    Neighbors of u are indices[indptr[u]:indptr[u+1]] with weights[indptr[u]:indptr[u+1]]
+    """
+    src = np.asarray(src, dtype=np.int32)
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(nodes_len + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum(np.bincount(src, minlength=nodes_len))
+    indices = np.asarray(dst, dtype=np.int32)[order]
+    weights = np.asarray(weights, dtype=np.float64)[order]
+    return indptr, indices, weights
+
+def group_by_community(node_community, communities_len):
+    """
+    Node indices of every community (list index is the community id), sorted by node index.
+    """
+    order = np.argsort(node_community, kind="stable")
+    bounds = np.cumsum(np.bincount(node_community, minlength=communities_len))[:-1]
+    return np.split(order, bounds)
+
+@njit(cache=True)
+def _best_community(node_index, indptr, indices, weights, node_community, node_degrees,
+                    community_total_degree, community_size, inv_m, inv_half_m, resolution, scratch, touched):
+    """
+    Same as Structure.updateBestCommunity, returns -1 if there is no community with positive q.
+    scratch is a zeroed float64 array indexed by community (shared degree), touched holds
+    the communities set in scratch, so only they are reset after the node.
+    """
+    current_community = node_community[node_index]
+    d_i = node_degrees[node_index]
+    n_touched = 0
+    for k in range(indptr[node_index], indptr[node_index + 1]):
+        community_index = node_community[indices[k]]
+        if scratch[community_index] == 0.0:
+            touched[n_touched] = community_index
+            n_touched += 1
+        scratch[community_index] += weights[k]
+
+    best = 0.0
+    best_community = -1
+    for t in range(n_touched):
+        community_index = touched[t]
+        shared_degree = scratch[community_index]
+        scratch[community_index] = 0.0
+        if shared_degree > 0.0:
+            # see Structure.q
+            same = community_index == current_community
+            if same and community_size[community_index] == 1:
+                continue
+            d_j = community_total_degree[community_index] - d_i * same
+            q_value = (resolution * shared_degree * 2.0 - d_i * d_j * inv_half_m) * inv_m
+            if q_value > best:
+                best = q_value
+                best_community = community_index
+    return best_community
+
+@njit(cache=True)
+def _move_node(node_index, community_index, node_community, node_degrees, community_total_degree, community_size):
+    current_community = node_community[node_index]
+    d_i = node_degrees[node_index]
+    community_size[current_community] -= 1
+    community_total_degree[current_community] -= d_i
+    community_size[community_index] += 1
+    community_total_degree[community_index] += d_i
+    node_community[node_index] = community_index
+
+@njit(cache=True)
+def _louvain_pass(order, indptr, indices, weights, node_community, node_degrees,
+                  community_total_degree, community_size, inv_m, inv_half_m, resolution, scratch, touched):
+    """
+    One local move pass over nodes in order, same as Structure.updateBestCommunity + moveNodeTo.
+    Returns the number of moved nodes.
+    """
+    moves = 0
+    for node_index in order:
+        best_community = _best_community(node_index, indptr, indices, weights, node_community, node_degrees,
+                                         community_total_degree, community_size, inv_m, inv_half_m, resolution,
+                                         scratch, touched)
+        if best_community >= 0 and best_community != node_community[node_index]:
+            _move_node(node_index, best_community, node_community, node_degrees, community_total_degree, community_size)
+            moves += 1
+    return moves
+
+@njit(cache=True)
+def _propose_moves(first, step, order, indptr, indices, weights, node_community, node_degrees,
+                   community_total_degree, community_size, inv_m, inv_half_m, resolution, proposals):
+    n = node_community.shape[0]
+    scratch = np.zeros(n, dtype=np.float64)
+    touched = np.empty(n, dtype=np.int32)
+    for i in range(first, order.shape[0], step):
+        proposals[i] = _best_community(order[i], indptr, indices, weights, node_community, node_degrees,
+                                       community_total_degree, community_size, inv_m, inv_half_m, resolution,
+                                       scratch, touched)
+
+@njit(cache=True, parallel=True)
+def _louvain_parallel_pass(order, indptr, indices, weights, node_community, node_degrees,
+                           community_total_degree, community_size, inv_m, inv_half_m, resolution,
+                           scratch, touched, nthreads):
+    """
+    Like _louvain_pass, but the best communities are first searched in parallel against the
+    communities at the start of the pass. Moving all proposed nodes at once can swap nodes
+    forth and back, so only the nodes with a proposal are checked again and moved serially.
+    Most nodes stay in their community after the first passes, so the serial part is small.
+    """
+    proposals = np.empty(order.shape[0], dtype=np.int32)
+    for t in prange(nthreads):
+        _propose_moves(t, nthreads, order, indptr, indices, weights, node_community, node_degrees,
+                       community_total_degree, community_size, inv_m, inv_half_m, resolution, proposals)
+    moves = 0
+    for i in range(order.shape[0]):
+        node_index = order[i]
+        if proposals[i] < 0 or proposals[i] == node_community[node_index]:
+            continue
+        best_community = _best_community(node_index, indptr, indices, weights, node_community, node_degrees,
+                                         community_total_degree, community_size, inv_m, inv_half_m, resolution,
+                                         scratch, touched)
+        if best_community >= 0 and best_community != node_community[node_index]:
+            _move_node(node_index, best_community, node_community, node_degrees, community_total_degree, community_size)
+            moves += 1
+    return moves
 
 class Structure:
-    def __init__(self, nodes_len,edges: List[tuple[int,int]]):
-        self.communities: List[Community] = [Community(i,i) for i in range(0,nodes_len)]
-        # node to node connections (undirected)
-        self.edges : Dict[int,(int,float)] = defaultdict(list)
-        self.orig_edges = defaultdict(list)
-        self.m = len(edges) * 2.0
-        self.node_community = []
-        self.node_selfreference = []
-        self.origin_nodes_community = []
-        self.last_modularity = None
-        for e in edges:
-            self.edges[e[1]].append((e[0],1.0))
-            self.edges[e[0]].append((e[1],1.0))
-            self.orig_edges[e[1]].append((e[0],1.0))
-            self.orig_edges[e[0]].append((e[1],1.0))
-        for i in range(0, nodes_len):
-            self.node_community.append(i)
-            self.origin_nodes_community.append(i)
-            self.node_selfreference.append(0.0)
+    def __init__(self, nodes_len,edges: List[tuple[int,int]], debug_checks=False, seed=None):
+        # communities are indexed by id, the nodes of a community are computed on demand (community_nodes)
+        self.community_size = np.ones(nodes_len, dtype=np.int32)
+        # node to node connections (undirected) as csr arrays
+        edges_array = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        self.indptr, self.indices, self.weights = edges_to_csr(
+            nodes_len,
+            edges_array[:, ::-1].ravel(),
+            edges_array.ravel(),
+            np.ones(2 * len(edges_array)))
+        self.set_m(len(edges) * 2.0)
+        # per node state as arrays (node_degrees and community_total_degrees are set in init_caches)
+        self.node_community = np.arange(nodes_len, dtype=np.int32)
+        self.node_selfreference = np.zeros(nodes_len, dtype=np.float64)
+        self.origin_nodes_community = np.arange(nodes_len, dtype=np.int32)
+        # recompute the modularity after every pass and check that the pass did not decrease it
+        self.check_invariants = False
+        # the original edges, only needed for compute_orig_modularity
+        self.debug_checks = debug_checks
+        self.orig_edges = None
+        # random node order for the local moves, a fixed seed gives reproducible communities
+        self._rng = np.random.default_rng(seed)
+        if debug_checks:
+            # merge_nodes replaces the csr arrays, so the original ones can be kept as they are
+            self.orig_edges = (self.indptr, self.indices, self.weights)
 
         self.init_caches(nodes_len)
     
+    def set_m(self, m):
+        self.m = m
+        # q is evaluated for every candidate community, so keep the reciprocals
+        self._inv_m = 1.0 / m if m else 0.0
+        self._inv_half_m = 2.0 / m if m else 0.0
+
+    def neighbors(self, node_index: int):
+        start, end = self.indptr[node_index], self.indptr[node_index + 1]
+        return self.indices[start:end], self.weights[start:end]
+
     def init_caches(self, nodes_len):
-        self.node_degrees = []
-        for node_index in range(0, nodes_len):
-            sum_weights = self.node_selfreference[node_index]
-            for _neighbor, weight in self.edges[node_index]:
-                sum_weights += weight
-            self.node_degrees.append(sum_weights)
-
-        for community in self.communities:
-            community.total_degree = self.community_total_degree_compute(community.id)
-
-        self.node_communities_weights = []
-        for node_index in range(0, nodes_len):
-            comp_weights = self.node_communities_compute(node_index)
-            self.node_communities_weights.append(comp_weights)
+        # weighted degree is the sum of the weights in the csr row
+        edge_src = np.repeat(np.arange(nodes_len), np.diff(self.indptr))
+        degrees = np.bincount(edge_src, weights=self.weights, minlength=nodes_len)
+        self.node_degrees = degrees + self.node_selfreference
+        self.community_total_degrees = np.bincount(self.node_community, weights=self.node_degrees,
+                                                   minlength=len(self.community_size))
+
+        # shared degree per community for one node, only the touched entries are set
+        self._weight_scratch = np.zeros(nodes_len, dtype=np.float64)
+        self._touched = np.empty(nodes_len, dtype=np.int32)
+        self._order = np.arange(nodes_len, dtype=np.int32)
     
-    def louvain(self, currentResolution=1.0, randomize = True):
+    def louvain(self, currentResolution=1.0, randomize = True, parallel = False):
         someChange = True
         while someChange:
             someChange = False
+            # the local moves run in _louvain_pass on arrays, the python methods
+            # (updateBestCommunity, q, moveNodeTo) are the reference for the tests
             localChange = True
             while localChange:
-                localChange = False
-                nodes = list(range(len(self.communities)))
-                random.shuffle(nodes)
-                for node_index in nodes:
-                    bestCommunity = self.updateBestCommunity(node_index, currentResolution)
-                    print(f"Node {node_index} best community {bestCommunity}")
-                    if bestCommunity and bestCommunity != self.node_community[node_index]:
-                        print(f"Moving node {node_index} from community {self.node_community[node_index]} to {bestCommunity} {self.communities[bestCommunity].nodes}")
-                        self.moveNodeTo(node_index, bestCommunity)
-                        modularity = self.compute_modularity()
-                        print(f"modularity: {modularity} orig_modularity {self.compute_orig_modularity()}")
-                        if self.last_modularity and self.last_modularity>modularity:
-                            raise Exception("wrong modularity hase became smaller")
-                        self.last_modularity = modularity
-                        localChange = True
+                if self.check_invariants:
+                    modularity_before = self.compute_modularity(currentResolution)
+                if randomize:
+                    self._rng.shuffle(self._order)
+                args = (self._order, self.indptr, self.indices, self.weights,
+                        self.node_community, self.node_degrees, self.community_total_degrees, self.community_size,
+                        self._inv_m, self._inv_half_m, currentResolution,
+                        self._weight_scratch, self._touched)
+                if parallel:
+                    moves = _louvain_parallel_pass(*args, get_num_threads())
+                else:
+                    moves = _louvain_pass(*args)
+                localChange = moves > 0
+                logger.debug("moved %d nodes", moves)
+                if self.check_invariants:
+                    modularity = self.compute_modularity(currentResolution)
+                    logger.debug("modularity: %s", modularity)
+                    if self.debug_checks:
+                        logger.debug("orig_modularity %s", self.compute_orig_modularity(currentResolution))
+                    # every move has positive q, the tolerance is for the float rounding
+                    if modularity < modularity_before - 1e-9:
+                        raise Exception("wrong modularity hase became smaller")
                 someChange = localChange or someChange
 
-            print(f"Final communities: {self.node_community}")
+            logger.debug("Final communities: %s", self.node_community)
             if someChange:
                 self.merge_nodes()
-                print(f"mapping {self.origin_nodes_community}")
-                print(f"merged edges {self.edges}")
-                print(f"self references {self.node_selfreference}")
-                print(f"node2communities {self.node_communities_weights}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("mapping %s", self.origin_nodes_community)
+                    logger.debug("merged edges %s %s %s", self.indptr, self.indices, self.weights)
+                    logger.debug("self references %s", self.node_selfreference)
+                    logger.debug("node2communities %s", [self.node_communities(i) for i in range(len(self.community_size))])
                 #break
                 #if len(self.node_community)<=4:
                 #    break
 
+    def community_nodes(self, community_index: int) -> List[int]:
+        return np.flatnonzero(self.node_community == community_index).tolist()
+
     def debug(self):
-        for c in self.communities:
-            print(f"Community {c.id}: nodes={c.nodes}")
+        for community_index, nodes in enumerate(group_by_community(self.node_community, len(self.community_size))):
+            print(f"Community {community_index}: nodes={nodes.tolist()}")
 
     def updateBestCommunity(self, node_index: int, resolution: float) -> int:
         best = 0
         bestCommunity = None
-        for community_index, shared_degree in self.node_communities(node_index).items():
+        scratch = self._weight_scratch
+        touched = self._touched
+        for i in range(self.shared_degrees(node_index)):
+            community_index = int(touched[i])
+            shared_degree = scratch[community_index]
+            scratch[community_index] = 0.0
             if shared_degree>0.0:
                 qValue = self.q(node_index, community_index, shared_degree, resolution)
-                print(f" node: {node_index} community {community_index} q={qValue}")
+                logger.debug(" node: %d community %d q=%s", node_index, community_index, qValue)
                 if qValue > best:
                     best = qValue
                     bestCommunity = community_index
         return bestCommunity
+
+    def shared_degrees(self, node_index: int) -> int:
+        # sums the edge weights from node to each neighbor community into self._weight_scratch,
+        # the communities are in self._touched[:n_touched], caller has to reset their scratch entries
+        scratch = self._weight_scratch
+        touched = self._touched
+        n_touched = 0
+        neighbors, weights = self.neighbors(node_index)
+        for community_index, weight in zip(self.node_community[neighbors].tolist(), weights.tolist()):
+            if scratch[community_index] == 0.0:
+                touched[n_touched] = community_index
+                n_touched += 1
+            scratch[community_index] += weight
+        return n_touched
     
     def node_communities(self, node_index: int) -> Dict[int,float]:
-        return self.node_communities_weights[node_index]
-    
-    def node_communities_compute(self, node_index: int) -> Dict[int,float]:
         communities = dict()
-        for neighbor, weight in self.edges[node_index]:
-            community_index = self.node_community[neighbor]
-            if community_index not in communities:
-                communities[community_index] = weight
-            else:
-                communities[community_index] += weight
+        scratch = self._weight_scratch
+        for community_index in self._touched[:self.shared_degrees(node_index)].tolist():
+            communities[community_index] = float(scratch[community_index])
+            scratch[community_index] = 0.0
         return communities
     
     def node_degree(self, node_index: int) -> float:
         return self.node_degrees[node_index]
     
-    def community_total_degree_compute(self, community_index: int) -> int:
-        sum = 0
-        for node_index in self.communities[community_index].nodes:
-            sum += self.node_degree(node_index)
-        return sum
-
-    def community_total_degree(self, community_index: int) -> int:
-        #return self.community_total_degree_compute(community_index)
-        return self.communities[community_index].total_degree
+    def community_total_degree(self, community_index: int) -> float:
+        return self.community_total_degrees[community_index]
 
     def shared_degree(self, node_index: int, community_index: int) -> int:
         # number of edges from node to community
         sum = 0.0
-        for neighbor, weight in self.edges[node_index]:
+        neighbors, weights = self.neighbors(node_index)
+        for neighbor, weight in zip(neighbors.tolist(), weights.tolist()):
             if self.node_community[neighbor] == community_index:
                 sum += weight
         return sum
@@ -157,107 +305,63 @@ class Structure:
         # d_ij = number of edges from node to community
         # d_i = degree of node
         # d_j = total degree of community
+        #
+        # for the current community we simulate the case that the node is removed from it,
+        # so the community total degree is reduced by d_i.
+        # A single node community is 0 (staying alone), shared_degree can still be > 0 by a self loop
 
-        current_community = self.node_community[node_index]
-        if current_community == community_index:
-            if len(self.communities[community_index].nodes) == 1:
-                return 0.0
-            else:
-                d_i = self.node_degree(node_index)
-                # we simulate the case that the node is removed from current community
-                # so the community total degree is reduced by d_i
-                d_j = self.community_total_degree(community_index) - d_i
-                d_ij = shared_degree * 2.0
-                return (resolution*d_ij-(d_i*d_j)/(self.m * 0.5))/(self.m)
-        else:
-            d_i = self.node_degree(node_index)
-            d_j = self.community_total_degree(community_index)
-            d_ij = shared_degree * 2.0
-            #print(f" d_i {d_i} d_j {d_j} d_ij {d_ij} m {self.m} self_reference {self.node_selfreference[node_index]} node_index {node_index}")
-            return (resolution*d_ij-(d_i*d_j)/(self.m * 0.5))/(self.m)
+        same = self.node_community[node_index] == community_index
+        if same and self.community_size[community_index] == 1:
+            return 0.0
+        d_i = self.node_degree(node_index)
+        d_j = self.community_total_degree(community_index) - d_i * same
+        d_ij = shared_degree * 2.0
+        return (resolution*d_ij - d_i*d_j*self._inv_half_m) * self._inv_m
 
     def moveNodeTo(self, node_index: int, community: int):
         old_community = self.node_community[node_index]
         node_degree = self.node_degree(node_index)
-        self.communities[old_community].remove_node(node_index)
-        self.communities[old_community].total_degree -= node_degree
-        self.communities[community].add_node(node_index)
-        self.communities[community].total_degree += node_degree
-        for neighbor, weight in self.edges[node_index]:
-            if old_community in self.node_communities_weights[neighbor]:
-                self.node_communities_weights[neighbor][old_community] -= weight
-                if self.node_communities_weights[neighbor][old_community] <= 0.0:
-                    del self.node_communities_weights[neighbor][old_community]
-            if community in self.node_communities_weights[neighbor]:
-                self.node_communities_weights[neighbor][community] += weight
-            else:
-                self.node_communities_weights[neighbor][community] = weight
-        
+        self.community_size[old_community] -= 1
+        self.community_total_degrees[old_community] -= node_degree
+        self.community_size[community] += 1
+        self.community_total_degrees[community] += node_degree
+        # the shared degrees of the neighbors are computed on demand in node_communities
         self.node_community[node_index] = community
 
 
-        # remove connection to old community
-        #nodes_len = len(self.node_communities_weights)
-        #self.node_communities_weights = []
-        #for node_index in range(0, nodes_len):
-        #    comp_weights = self.node_communities_compute(node_index)
-        #    self.node_communities_weights.append(comp_weights)
-
-
     def merge_nodes(self):
         # We need new length of nodes, which is number of not empty communities
         # after it the list of edges between communities
         # we need to map between old community id and new community id
-        community_id_map : map[int,int] = dict()
-        new_community_count = 0
-        for c in self.communities:
-            if len(c.nodes) > 0:
-                community_id_map[c.id] = new_community_count
-                new_community_count += 1
-        new_communities = []
-        new_edges = {}
-        new_node_selfreference = []
-        m = 0.0
-        for community_id, new_community_id in community_id_map.items():
-            c = self.communities[community_id]
-            c.id = new_community_id
-            edges_for_community = {}
-            new_communities.append(c)
-            self_reference = 0.0
-            for node in c.nodes:
-                for neighbor, weight in self.edges[node]:
-                    neighbor_community = self.node_community[neighbor]
-                    neighbor_community_new = community_id_map[neighbor_community]
-                    if neighbor_community_new in edges_for_community:
-                        edges_for_community[neighbor_community_new] += weight
-                    else:
-                        edges_for_community[neighbor_community_new] = weight
-                self_reference += self.node_selfreference[node]
-            new_edges[new_community_id] = []
-            c.nodes = [new_community_id]
-            for neighbor_community, weight in edges_for_community.items():
-                m += weight
-                if neighbor_community == new_community_id:
-                    self_reference += weight
-                else:
-                    new_edges[new_community_id].append((neighbor_community, weight))
-            new_node_selfreference.append(self_reference)
-
-        self.communities = new_communities
+        # the not empty communities get contiguous new ids, new_node is the new id of every node
+        communities, new_node = np.unique(self.node_community, return_inverse=True)
+        new_node = new_node.astype(np.int32)
+        new_community_count = len(communities)
+        # new community of both ends of every csr edge
+        new_src = new_node[np.repeat(np.arange(len(new_node)), np.diff(self.indptr))]
+        new_dst = new_node[self.indices]
+        inner = new_src == new_dst
+        # edges inside a community become self references of the new node
+        new_node_selfreference = np.bincount(new_node, weights=self.node_selfreference, minlength=new_community_count)
+        new_node_selfreference += np.bincount(new_src[inner], weights=self.weights[inner], minlength=new_community_count)
+        # coo -> csr sums the parallel edges between two new nodes
+        quotient = coo_matrix((self.weights[~inner], (new_src[~inner], new_dst[~inner])),
+                              shape=(new_community_count, new_community_count)).tocsr()
+        m = float(self.weights.sum())
+
+        self.community_size = np.ones(new_community_count, dtype=np.int32)
         self.node_selfreference = new_node_selfreference
 
-        for i in range(0, len(self.origin_nodes_community)):
-            new_community_old_id = self.node_community[self.origin_nodes_community[i]]
-            self.origin_nodes_community[i] = community_id_map[new_community_old_id]
+        self.origin_nodes_community = new_node[self.origin_nodes_community]
 
-        self.edges = new_edges
-        self.m = m
-        self.node_community = []
-        for i in range(0, new_community_count):
-            self.node_community.append(i)
+        self.indptr = quotient.indptr.astype(np.int32)
+        self.indices = quotient.indices.astype(np.int32)
+        self.weights = quotient.data.astype(np.float64)
+        self.set_m(m)
+        self.node_community = np.arange(new_community_count, dtype=np.int32)
 
         self.init_caches(new_community_count)            
-        print(f"Merged to new {new_community_count} communities")
+        logger.debug("Merged to new %d communities", new_community_count)
 
     def compute_modularity(self, resolution=1.0):
         """
@@ -269,61 +373,49 @@ class Structure:
         if m == 0:
             return 0.0
 
+        node_community = self.node_community
+        nodes_len = len(node_community)
         # degree of each node (including self-loop)
         k = self.node_degrees
 
-        # community -> list of nodes
-        communities = defaultdict(list)
-        for node, comm in enumerate(self.node_community):
-            communities[comm].append(node)
+        # community of the source and target of every csr edge
+        edge_src_community = node_community[np.repeat(np.arange(nodes_len), np.diff(self.indptr))]
+        same = edge_src_community == node_community[self.indices]
 
-        Q = 0.0
-        for nodes in communities.values():
-            # sum of weights of internal edges
-            in_weight = 0.0
-            tot_degree = 0.0
-            for u in nodes:
-                tot_degree += k[u]
-                for v, w in self.edges.get(u, []):
-                    if self.node_community[v] == self.node_community[u]:
-                        in_weight += w
-                # include self-loop if any
-                in_weight += self.node_selfreference[u]
-
-            # each internal edge counted twice (u->v and v->u), so divide by 2
-            in_weight /= 2.0
+        # sum of weights of internal edges per community,
+        # each internal edge counted twice (u->v and v->u), so divide by 2
+        # astype: bincount of an empty array is int64 even with weights
+        in_weight = np.bincount(edge_src_community, weights=self.weights * same, minlength=nodes_len).astype(np.float64)
+        # include self-loop if any
+        in_weight += np.bincount(node_community, weights=self.node_selfreference, minlength=nodes_len)
+        in_weight /= 2.0
+        tot_degree = np.bincount(node_community, weights=k, minlength=nodes_len)
 
-            Q += in_weight / m - resolution * (tot_degree / (2*m))**2
-
-        return Q
+        return float((in_weight / m - resolution * (tot_degree / (2*m))**2).sum())
     
     def compute_orig_modularity(self, resolution=1.0):
-        m = 0.0
-
-        # community -> list of nodes
-        communities = defaultdict(list)
-        for node, comm in enumerate(self.origin_nodes_community):
-            current_com = self.node_community[comm]
-            communities[current_com].append(node)
-
-        k = {}
-        for node, edges in self.orig_edges.items():
-            node_degree = len(edges) * 1.0
-            k[node] = node_degree
-            m += node_degree
-
-        m = m * 0.5
+        # modularity of the original graph, needs Structure(..., debug_checks=True)
+        if self.orig_edges is None:
+            raise ValueError("compute_orig_modularity needs debug_checks")
+        indptr, indices, weights = self.orig_edges
+        # current community of every original node
+        orig_community = self.node_community[self.origin_nodes_community]
+        communities = group_by_community(orig_community, len(self.community_size))
+
+        nodes_len = len(indptr) - 1
+        k = np.bincount(np.repeat(np.arange(nodes_len), np.diff(indptr)), weights=weights, minlength=nodes_len)
+        m = k.sum() * 0.5
 
         Q = 0.0
-        for nodes in communities.values():
+        for comm, nodes in enumerate(communities):
             # sum of weights of internal edges
             in_weight = 0.0
             tot_degree = 0.0
-            for u in nodes:
+            for u in nodes.tolist():
                 tot_degree += k[u]
-                for v, w in self.orig_edges.get(u, []):
-                    if self.node_community[self.origin_nodes_community[v]] == self.node_community[self.origin_nodes_community[u]]:
-                        in_weight += w
+                s, e = indptr[u], indptr[u + 1]
+                same = orig_community[indices[s:e]] == comm
+                in_weight += weights[s:e][same].sum()
 
             # each internal edge counted twice (u->v and v->u), so divide by 2
             in_weight /= 2.0
@@ -333,13 +425,14 @@ class Structure:
         return Q
                 
 
-def louvain(nodes_len,edges: List[tuple[int,int]],currentResolution=1.0):
+def louvain(nodes_len,edges: List[tuple[int,int]],currentResolution=1.0, seed=None):
     # Initial partition: each node in its own community
-    structure = Structure(nodes_len, edges)
+    structure = Structure(nodes_len, edges, seed=seed)
     return structure.louvain(currentResolution)
 
 # ---------- demonstration on a small graph ----------
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     # simple graph with two communities: {0,1,2} and {3,4,5}
     if True:
         edges = [
@@ -350,7 +443,7 @@ if __name__ == "__main__":
         ]
         #louvain(6, edges)
         print("Louvain optimization demo")
-        structure = Structure(6, edges)
+        structure = Structure(6, edges, debug_checks=True)
         structure.debug()
         assert structure.node_degree(0) == 2.0
         assert structure.node_degree(1) == 1.0
@@ -370,8 +463,9 @@ if __name__ == "__main__":
         assert structure.node_communities(1).keys() == {0}
         structure.moveNodeTo(1,0)
         assert structure.node_community[1] == 0
-        assert len(structure.communities[0].nodes) == 2
-        assert len(structure.communities[1].nodes) == 0
+        assert structure.community_size[0] == 2
+        assert structure.community_size[1] == 0
+        assert structure.community_nodes(0) == [0, 1]
         assert structure.node_degree(1) == 1
         assert structure.community_total_degree(0) == 3
         assert structure.community_total_degree(1) == 0
@@ -380,19 +474,19 @@ if __name__ == "__main__":
         #print(f"node_communities 0: {structure.node_communities(0)}")
         assert structure.node_communities(0).keys() == {0, 2}
         assert structure.node_communities(1).keys() == {0}
-        assert len(structure.communities) == 6
+        assert len(structure.community_size) == 6
         old_m = structure.m
         structure.merge_nodes()
         new_m = structure.m
         print(f"m {new_m} m_old {old_m}")
         assert old_m == new_m
-        assert len(structure.communities) == 5
-        assert structure.origin_nodes_community == [0,0,1,2,3,4]
-        assert len(structure.edges[0]) == 1
-        assert len(structure.edges[1]) == 2
+        assert len(structure.community_size) == 5
+        assert structure.origin_nodes_community.tolist() == [0,0,1,2,3,4]
+        assert len(structure.neighbors(0)[0]) == 1
+        assert len(structure.neighbors(1)[0]) == 2
         assert structure.node_selfreference[0] == 2.0
-        assert structure.communities[0].nodes == [0]
-        assert structure.communities[1].nodes == [1]
+        assert structure.community_nodes(0) == [0]
+        assert structure.community_nodes(1) == [1]
 
         #print(f"node degree {structure.node_degree(0)}")
         #assert structure.node_degree(0) == 3.0
@@ -409,7 +503,7 @@ if __name__ == "__main__":
         assert math.isclose(modularity_new,modularity + q_delta)
 
         print("Restart 1")
-        structure = Structure(6, edges)
+        structure = Structure(6, edges, debug_checks=True)
 
         modularity = structure.compute_modularity()
         my_node_communities = structure.node_communities(0)
@@ -432,10 +526,19 @@ if __name__ == "__main__":
         assert my_node_communities[1] == 1.0
 
         print("Restart 2")
-        structure = Structure(6, edges)
+        structure = Structure(6, edges, debug_checks=True)
+        structure.check_invariants = True
+        structure.louvain(1.0)
+        assert len(structure.community_size) == 2
+        print("Origin communities:", structure.origin_nodes_community.tolist())
+
+        print("Restart 2 nodes")
+        # after the merge there are no edges between communities left
+        structure = Structure(2, [(0, 1)], debug_checks=True)
+        structure.check_invariants = True
         structure.louvain(1.0)
-        assert len(structure.communities) == 2
-        print("Origin communities:", structure.origin_nodes_community)
+        assert len(structure.community_size) == 1
+        assert structure.compute_modularity() == 0.0
 
     print("Restart 3")
     complex_edges = [
@@ -451,7 +554,8 @@ if __name__ == "__main__":
         (10,11),(10,12),(10,13),(10,14),
         (11,13)
     ]
-    structure = Structure(16, complex_edges)
+    structure = Structure(16, complex_edges, debug_checks=True)
+    structure.check_invariants = True
     structure.louvain(0.414, False)
-    print("Origin communities complex:", structure.origin_nodes_community)
+    print("Origin communities complex:", structure.origin_nodes_community.tolist())
 
@@ -0,0 +1,157 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+
+# Cython build of louvain.py (local moves like _louvain_pass, same q formula)
+# It is named louvain_cy so the compiled module does not shadow louvain.py
+#
+# build: CFLAGS="-O3 -march=native" cythonize -i louvain_cy.pyx
+#
+#   import louvain_cy
+#   structure = louvain_cy.Structure(nodes_len, edges, seed=1)
+#   origin_nodes_community = structure.louvain(1.0)
+
+import numpy as np
+from louvain import edges_to_csr
+
+
+cdef class Structure:
+    cdef int[::1] indptr
+    cdef int[::1] indices
+    cdef double[::1] weights
+    cdef int[::1] node_community
+    cdef double[::1] node_degrees
+    cdef double[::1] node_selfreference
+    cdef int[::1] community_size
+    cdef double[::1] community_total_degrees
+    cdef int[::1] origin_nodes_community
+    cdef double[::1] scratch
+    cdef int[::1] touched
+    cdef int[::1] order
+    cdef double m, inv_m, inv_half_m
+    cdef object rng
+
+    def __init__(self, int nodes_len, edges, seed=None):
+        edges_array = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        indptr, indices, weights = edges_to_csr(
+            nodes_len,
+            edges_array[:, ::-1].ravel(),
+            edges_array.ravel(),
+            np.ones(2 * len(edges_array)))
+        self.rng = np.random.default_rng(seed)
+        self.origin_nodes_community = np.arange(nodes_len, dtype=np.int32)
+        self.set_graph(indptr, indices, weights, np.zeros(nodes_len, dtype=np.float64), len(edges_array) * 2.0)
+
+    cdef set_graph(self, indptr, indices, weights, node_selfreference, double m):
+        # every node is in its own community
+        nodes_len = len(indptr) - 1
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.node_selfreference = node_selfreference
+        self.m = m
+        self.inv_m = 1.0 / m if m else 0.0
+        self.inv_half_m = 2.0 / m if m else 0.0
+        edge_src = np.repeat(np.arange(nodes_len), np.diff(indptr))
+        node_degrees = np.bincount(edge_src, weights=weights, minlength=nodes_len) + node_selfreference
+        self.node_degrees = node_degrees
+        self.community_total_degrees = node_degrees.copy()
+        self.node_community = np.arange(nodes_len, dtype=np.int32)
+        self.community_size = np.ones(nodes_len, dtype=np.int32)
+        self.scratch = np.zeros(nodes_len, dtype=np.float64)
+        self.touched = np.empty(nodes_len, dtype=np.int32)
+        self.order = np.arange(nodes_len, dtype=np.int32)
+
+    @property
+    def communities_len(self):
+        return self.community_size.shape[0]
+
+    cdef inline double q(self, int node_index, int community_index, double shared_degree, double resolution) noexcept nogil:
+        cdef bint same = community_index == self.node_community[node_index]
+        cdef double d_i = self.node_degrees[node_index]
+        # a single node community is 0 (shared_degree can still be > 0 by a self loop)
+        if same and self.community_size[community_index] == 1:
+            return 0.0
+        # for the current community the node is removed from it
+        cdef double d_j = self.community_total_degrees[community_index] - d_i * same
+        return (resolution * shared_degree * 2.0 - d_i * d_j * self.inv_half_m) * self.inv_m
+
+    cdef int best_community(self, int node_index, double resolution) noexcept nogil:
+        cdef int n_touched = 0
+        cdef int k, t, community_index
+        cdef double shared_degree, q_value
+        cdef double best = 0.0
+        cdef int best_community = -1
+        for k in range(self.indptr[node_index], self.indptr[node_index + 1]):
+            community_index = self.node_community[self.indices[k]]
+            if self.scratch[community_index] == 0.0:
+                self.touched[n_touched] = community_index
+                n_touched += 1
+            self.scratch[community_index] += self.weights[k]
+        for t in range(n_touched):
+            community_index = self.touched[t]
+            shared_degree = self.scratch[community_index]
+            self.scratch[community_index] = 0.0
+            if shared_degree > 0.0:
+                q_value = self.q(node_index, community_index, shared_degree, resolution)
+                if q_value > best:
+                    best = q_value
+                    best_community = community_index
+        return best_community
+
+    cdef int local_pass(self, double resolution) noexcept nogil:
+        cdef int i, node_index, current_community, best_community
+        cdef double d_i
+        cdef int moves = 0
+        for i in range(self.order.shape[0]):
+            node_index = self.order[i]
+            best_community = self.best_community(node_index, resolution)
+            current_community = self.node_community[node_index]
+            if best_community >= 0 and best_community != current_community:
+                d_i = self.node_degrees[node_index]
+                self.community_size[current_community] -= 1
+                self.community_total_degrees[current_community] -= d_i
+                self.community_size[best_community] += 1
+                self.community_total_degrees[best_community] += d_i
+                self.node_community[node_index] = best_community
+                moves += 1
+        return moves
+
+    cdef merge_nodes(self):
+        # same result as Structure.merge_nodes in louvain.py, done with numpy
+        node_community = np.asarray(self.node_community)
+        # new_id is the new (contiguous) community id of every node
+        _, new_id = np.unique(node_community, return_inverse=True)
+        new_community_count = int(new_id.max()) + 1
+        indptr = np.asarray(self.indptr)
+        src = new_id[np.repeat(np.arange(len(node_community)), np.diff(indptr))]
+        dst = new_id[np.asarray(self.indices)]
+        weights = np.asarray(self.weights)
+        # sum the parallel edges between two new communities
+        keys, edge_index = np.unique(src.astype(np.int64) * new_community_count + dst, return_inverse=True)
+        key_weights = np.bincount(edge_index, weights=weights)
+        key_src = keys // new_community_count
+        key_dst = keys % new_community_count
+        inner = key_src == key_dst
+        node_selfreference = np.bincount(new_id, weights=np.asarray(self.node_selfreference), minlength=new_community_count)
+        node_selfreference += np.bincount(key_src[inner], weights=key_weights[inner], minlength=new_community_count)
+        origin = np.asarray(self.origin_nodes_community)
+        self.origin_nodes_community = new_id[origin].astype(np.int32)
+        new_indptr, new_indices, new_weights = edges_to_csr(
+            new_community_count, key_src[~inner], key_dst[~inner], key_weights[~inner])
+        self.set_graph(new_indptr, new_indices, new_weights, node_selfreference, weights.sum())
+
+    def louvain(self, double resolution=1.0, bint randomize=True):
+        cdef int moves
+        some_change = True
+        while some_change:
+            some_change = False
+            while True:
+                if randomize:
+                    self.rng.shuffle(np.asarray(self.order))
+                with nogil:
+                    moves = self.local_pass(resolution)
+                if moves == 0:
+                    break
+                some_change = True
+            if some_change:
+                self.merge_nodes()
+        return np.asarray(self.origin_nodes_community).tolist()
@@ -1,5 +1,7 @@
 import networkx as nx
-import matplotlib.pyplot as plt
+import numpy as np
+from scipy.sparse import identity
+from scipy.sparse.linalg import eigsh
 
 def draw_graph(G,pos,ax,title):
     nx.draw_networkx_nodes(G, pos, node_size=300,ax=ax)
@@ -7,15 +9,35 @@ def draw_graph(G,pos,ax,title):
     nx.draw_networkx_labels(G, pos, alpha=0.5,ax=ax)
     ax.set_title(title)
 
-fig, axes = plt.subplots(1, 2, figsize=(10, 5))
+def sparse_spectral_layout(G):
+    # same as nx.spectral_layout, but with ARPACK on the sparse laplacian only.
+    # The smallest eigenvalues of L are the largest of c*I - L (c >= max eigenvalue of L),
+    # this converges much faster than which='SM' and needs no factorization like shift-invert,
+    # which fills in badly on big graphs.
+    # The first eigenvector is constant, the next two are the coordinates.
+    nodes = list(G)
+    # eigsh needs k < number of nodes, the dense layout is fine for tiny graphs
+    if len(nodes) <= 3:
+        return nx.spectral_layout(G)
+    L = nx.laplacian_matrix(G, nodelist=nodes).astype(np.float64)
+    c = 2.0 * L.diagonal().max()
+    eigenvalues, eigenvectors = eigsh(c * identity(L.shape[0]) - L, k=3, which='LA')
+    order = np.argsort(-eigenvalues)
+    pos = nx.rescale_layout(eigenvectors[:, order[1:3]])
+    return dict(zip(nodes, pos))
 
-G = nx.karate_club_graph()
-pos = nx.spring_layout(G)
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
 
-draw_graph(G,pos,axes[0],"spring")
+    fig, axes = plt.subplots(1, 2, figsize=(10, 5))
 
-pos_spec = nx.spectral_layout(G)
-draw_graph(G,pos_spec,axes[1],"spectral")
+    G = nx.karate_club_graph()
+    pos = nx.spring_layout(G)
 
+    draw_graph(G,pos,axes[0],"spring")
 
-plt.show()
\ No newline at end of file
+    pos_spec = sparse_spectral_layout(G)
+    draw_graph(G,pos_spec,axes[1],"spectral")
+
+
+    plt.show()
\ No newline at end of file
@@ -1,46 +1,102 @@
-import csv
+import logging
+import math
+import numpy as np
+import pandas as pd
+from numba import njit
 
-def load_data():
-    data = []
-    with open("statistics.csv", newline="") as f:
-        reader = csv.DictReader(f)  # Reads columns by name: "source", "target"
-        for row in reader:
-            data.append([row["iri"],row["Betweenness Centrality"]])
-    return data
+logger = logging.getLogger(__name__)
 
+def load_data():
+    # only the two needed columns, parsed by the pandas c reader
+    df = pd.read_csv("statistics.csv", usecols=["iri", "Betweenness Centrality"],
+                     dtype={"iri": "string", "Betweenness Centrality": "float64"})
+    return df["iri"].to_numpy(), df["Betweenness Centrality"].to_numpy()
+
+# q^n für ganzzahliges n durch wiederholtes Quadrieren, nur Multiplikationen statt pow
+@njit(cache=True)
+def ipow(q, n):
+    result = 1.0
+    while n > 0:
+        if n & 1:
+            result *= q
+        q *= q
+        n >>= 1
+    return result
+
+# Gleichung f(q) = a*(1 - q^n)/(1 - q) - S
+@njit(cache=True)
+def f(q, a, n, S):
+    if q == 1.0:
+        return a*n - S  # Limes q->1
+    return a*(1 - ipow(q, n))/(1 - q) - S
+
+# f und Ableitung f'(q) = a*((n-1)*q^n - n*q^(n-1) + 1)/(q-1)^2, q^n wird nur einmal berechnet
+@njit(cache=True)
+def f_df(q, a, n, S):
+    if q == 1.0:
+        return a*n - S, a*n*(n-1)/2
+    qn = ipow(q, n)
+    return a*(1 - qn)/(1 - q) - S, a*((n-1)*qn - n*qn/q + 1)/(q - 1)**2
+
+@njit(cache=True)
 def berechne_q(S, a, n, tol=1e-10, max_iter=1000):
     """
     Berechnet den Quotienten q einer geometrischen Reihe
     mit Summe S, erstem Glied a und n Gliedern.
-    Rein numerische Lösung mit Bisection.
+    Numerische Lösung mit Newton-Verfahren, Bisection als Rückfall.
     """
     if n <= 0:
         raise ValueError("n muss > 0 sein")
     if S == a:
         return 1.0  # Spezialfall: Summe = erstes Glied -> q=1
-
-    # Gleichung f(q) = a*(1 - q^n)/(1 - q) - S
-    def f(q):
-        if q == 1:
-            return a*n - S  # Limes q->1
-        return a*(1 - q**n)/(1 - q) - S
+    if n == 1 or S < a:
+        raise ValueError("Keine Lösung mit q > 0")
 
     # Bisection benötigt Intervall [low, high]
-    # Typischerweise 0 < q < S/a + 1 (grober Startwert)
-    low, high = 0.0, max(2.0, S/a)
+    # Eingrenzung aus den Gliedern, q^(n-1) liegt zwischen S/(n*a) und S/a
+    r = (S/(n*a))**(1.0/(n - 1))
+    if S > n*a:
+        low, high = r, (S/a)**(1.0/(n - 1))  # q > 1
+    else:
+        low, high = 1.0 - a/S, r  # q <= 1, S < a/(1-q)
 
+    # Newton-Verfahren, konvergiert quadratisch (wenige Schritte statt ~40 Halbierungen)
+    # f ist für q > 0 streng monoton steigend und konvex, von high aus
+    # nähert sich Newton der Lösung monoton von rechts
+    # mit dem Vorzeichen von f wird [low, high] verkleinert
+    q = high
     for _ in range(max_iter):
+        if not low <= q <= high:
+            break
+        val, dval = f_df(q, a, n, S)
+        if abs(val) < tol:
+            return q
+        if val < 0:
+            low = q
+        else:
+            high = q
+        if dval <= 0:
+            break
+        q = q - val/dval
+
+    # Rückfall: Bisection auf dem verkleinerten Intervall
+    # f(low) ändert sich nur, wenn low verschoben wird
+    # jeder Schritt halbiert das Intervall, danach ist die Breite < tol
+    f_low = f(low, a, n, S)
+    steps = math.ceil(math.log2((high - low)/tol)) + 2 if high - low > tol else 1
+    for _ in range(steps):
         mid = (low + high) / 2
-        val = f(mid)
+        val = f(mid, a, n, S)
 
         if abs(val) < tol:
             return mid
-        elif f(low) * val < 0:
+        elif f_low * val < 0:
             high = mid
         else:
             low = mid
+            f_low = val
 
-    raise RuntimeError("Keine Lösung gefunden, max_iter erreicht")
+    return (low + high) / 2
 
 def test():
     q = berechne_q(52, 4, 10)
@@ -53,38 +109,19 @@ def test():
         a *= q
         print(f"sum : {sum}")
 
-def distribute_values(data):
-    data_len = len(data)
-    if data_len <= 10:
-        start = 1
-    else:
-        start = 4.0
-    pos = 0
-    q = berechne_q(data_len, start, 10)
-    if q < 1.0:
-        q = 1.0
-    ranges = []
-    for idx in range(10):
-        if idx == 9:
-            end = data_len-1
-        else:
-            end = int(pos+start+0.5)-1
-        if end>data_len-1:
-            end = data_len-1
-            ranges.append((pos,end))
-            break
-        else:
-            ranges.append((pos,end))
-        pos = end+1
-        start *= q
-    
+# fixed signature, compiled once at import for every input
+@njit("int64[:,:](int32[::1], int64[:,:])", cache=True, nogil=True)
+def _correct_ranges(run_id, raw_ranges):
     # The range must be at least 1
     # There should be not same values if different ranges - could lead to wrong perception of data
+    # run_id of the sorted values, raw_ranges (start,end) rows, returns the corrected rows
+    data_len = run_id.shape[0]
+    corrected = np.empty_like(raw_ranges)
+    n_corrected = 0
     next_start = -1
-    ranges_corrected = []
-    print(f"start len {data_len} q={q}")
-    for idx,(start,end) in enumerate(ranges):
-        print(f"Range {start} .. {end}")
+    for idx in range(raw_ranges.shape[0]):
+        start = raw_ranges[idx, 0]
+        end = raw_ranges[idx, 1]
         if next_start >= 0:
             start = next_start
         next_start = -1
@@ -94,66 +131,98 @@ def distribute_values(data):
             if next_start > data_len-1:
                 break
         if idx>0:
-            (last_start,last_end) = ranges_corrected[-1]
-            if data[start][1] == data[last_end][1]:
-                print("same value - increase range")
-                if data[start][1] == data[end][1]:
-                    print("same value in whole range - need to shirk previous range")
-                    if data[last_start][1] == data[last_end][1]:
-                        print("same value in whole previous range - collapse range to previous one")
+            last_start = corrected[n_corrected-1, 0]
+            last_end = corrected[n_corrected-1, 1]
+            # same value - increase range
+            if run_id[start] == run_id[last_end]:
+                # same value in whole range - need to shirk previous range
+                if run_id[start] == run_id[end]:
+                    if run_id[last_start] == run_id[last_end]:
+                        # same value in whole previous range - collapse range to previous one
                         next_start = end+1
-                        ranges_corrected[-1] = (last_start,end)
+                        corrected[n_corrected-1, 1] = end
                         continue
                     else:
-                        while data[last_end][1] == data[start][1]:
-                            last_end -= 1
-                        ranges_corrected[-1] = (last_start,last_end)
+                        # end previous range before the run of start
+                        last_end = np.searchsorted(run_id, run_id[start], side='left') - 1
+                        corrected[n_corrected-1, 1] = last_end
                         start = last_end+1
                 else:    
-                    while data[last_end][1] == data[start][1]:
-                        start += 1
-                    ranges_corrected[-1] = (last_start,start-1)
-        ranges_corrected.append((start,end))
-        
-    ranges = ranges_corrected
+                    # previous range takes the whole run of start
+                    start = np.searchsorted(run_id, run_id[start], side='right')
+                    corrected[n_corrected-1, 1] = start-1
+        corrected[n_corrected, 0] = start
+        corrected[n_corrected, 1] = end
+        n_corrected += 1
+    return corrected[:n_corrected]
+
+def distribute_values(values):
+    # values is a float array sorted descending
+    data_len = len(values)
+    # equal values are contiguous runs, run_id numbers them in ascending order
+    # values are parsed floats, so exact compare is right ("0.10" and "0.1" are the same run),
+    # a tolerance would merge neighbouring values that differ in the data
+    run_id = np.cumsum(np.concatenate(([0], np.diff(values) != 0)), dtype=np.int32)
+    if data_len <= 10:
+        start = 1
+    else:
+        start = 4.0
+    pos = 0
+    # 10 ranges of size start already cover the data (always for data_len <= 40),
+    # the solution would be q <= 1 which is clamped to 1 anyway
+    if data_len <= 10*start:
+        q = 1.0
+    else:
+        q = berechne_q(data_len, start, 10)
+    ranges = np.empty((10,2), dtype=np.int64)
+    n_ranges = 0
+    for idx in range(10):
+        if idx == 9:
+            end = data_len-1
+        else:
+            end = int(pos+start+0.5)-1
+        last = end>data_len-1
+        if last:
+            end = data_len-1
+        ranges[n_ranges,0] = pos
+        ranges[n_ranges,1] = end
+        n_ranges += 1
+        if last:
+            break
+        pos = end+1
+        start *= q
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("start len %d q=%s", data_len, q)
+        for i in range(n_ranges):
+            logger.debug("Range %d .. %d", ranges[i,0], ranges[i,1])
+    ranges = _correct_ranges(run_id, ranges[:n_ranges])
 
     sum = 0
     last_len = 0
     for idx,(start,end) in enumerate(ranges):
-        layer = data[start:end+1]
-        sum += len(layer)
-        print(f"Layer {idx} start {start}:{end} size {len(layer)} diff {len(layer)-last_len} 1st={layer[0][1]}  end={layer[-1][1]}")
-        last_len = len(layer)
+        size = end-start+1
+        sum += size
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Layer %d start %d:%d size %d diff %d 1st=%s  end=%s", idx, start, end, size, size-last_len, values[start], values[end])
+        last_len = size
     if sum != data_len:
         raise ValueError(f"Error: sum {sum} != data_len {data_len}")
 
-    print(f"Sum: {sum} q={q} of {data_len} layers {len(ranges)}")
+    logger.debug("Sum: %d q=%s of %d layers %d", sum, q, data_len, len(ranges))
 
-data = load_data()
-distribute_values(data)
+if __name__ == "__main__":
+    # only this module, numba logs its compilation at DEBUG level too
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(logging.DEBUG)
 
-data = []
-data.extend([["1",1.0]]*10)
-s = 0.999
-d = 0.001
-for _ in range(20):
-    data.append(["2",s])
-    s -= d
-distribute_values(data)
+    iris, values = load_data()
+    distribute_values(values)
 
-data = []
-s = 0.999
-d = 0.001
-for _ in range(9):
-    data.append(["m",s])
-    s -= d
+    distribute_values(np.concatenate((np.full(10, 1.0), 0.999 - 0.001*np.arange(20))))
 
-distribute_values(data)
+    distribute_values(0.999 - 0.001*np.arange(9))
 
-data = []
-data.extend([["1",1.0]]*10)
-distribute_values(data)
+    distribute_values(np.full(10, 1.0))
 
-data = [["1",1.0]]
-data.extend([["1",0.3]]*10)
-distribute_values(data)
\ No newline at end of file
+    distribute_values(np.concatenate(([1.0], np.full(10, 0.3))))
\ No newline at end of file